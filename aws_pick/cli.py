@@ -4,36 +4,71 @@ This module provides the main CLI functionality for the AWS Pick tool,
 including user interaction, profile selection, and command execution.
 """
 
-import argparse
 import os
 import logging
 import sys
-from typing import List, Optional
-
-from aws_pick.config import (
-    display_profiles,
-    get_grouped_profiles,
-    read_aws_profiles,
-    validate_profile_selection,
-)
-from aws_pick.shell import (
-    detect_shell,
-    generate_export_command,
-    get_current_profile,
-    get_rc_path,
-    update_aws_profile,
-    write_shared_profile,
-)
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, List, Optional, Union
+
+if TYPE_CHECKING:
+    import argparse
+
 logger = logging.getLogger(__name__)
 
+_QUIT_COMMANDS = frozenset(("q", "quit", "exit"))
+
+# Hand-written copy of the argparse help so `awspick --help` can skip
+# building the parser. Keep in sync with parse_args().
+HELP_TEXT = """\
+usage: awspick [-h] [-f FILTER] [-x EXCLUDE] [-g GROUPS]
+               [--group-rules GROUP_RULES] [--regex] [--case-sensitive]
+               [--no-backup]
+
+AWS profile picker
+
+options:
+  -h, --help            show this help message and exit
+  -f FILTER, --filter FILTER
+                        Only show profiles that match any of these substrings
+                        (can repeat or comma-separate)
+  -x EXCLUDE, --exclude EXCLUDE
+                        Exclude profiles that match any of these substrings
+                        (can repeat or comma-separate)
+  -g GROUPS, --groups GROUPS
+                        Comma-separated group names to display (e.g.,
+                        prod,dev)
+  --group-rules GROUP_RULES
+                        Custom group rules, e.g.
+                        'preprod=preprod;prod=prod,production;dev=dev' (order
+                        matters)
+  --regex               Treat filter/exclude as regular expressions
+  --case-sensitive      Make filter/exclude matching case-sensitive
+  --no-backup           Do not keep a backup of the shell rc file when it is
+                        rewritten
+"""
+
+
+def _default_args() -> SimpleNamespace:
+    """Return the values parse_args() yields when no flags are given."""
+    return SimpleNamespace(
+        export_command=False,
+        filter=None,
+        exclude=None,
+        groups=None,
+        group_rules=None,
+        regex=False,
+        case_sensitive=False,
+        no_backup=False,
+    )
+
 
-def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
-    """Parse command-line arguments."""
+def _build_parser() -> "argparse.ArgumentParser":
+    import argparse
 
-    parser = argparse.ArgumentParser(description="AWS profile picker")
+    parser = argparse.ArgumentParser(prog="awspick", description="AWS profile picker")
+    # Python 3.9 titles this section "optional arguments"; pin the newer name
+    # so the output matches HELP_TEXT on every supported version
+    parser._optionals.title = "options"
     # Deprecated option kept for backward compatibility but ignored
     parser.add_argument(
         "--export-command",
@@ -74,7 +109,35 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Make filter/exclude matching case-sensitive",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--no-backup",
+        action="store_true",
+        help="Do not keep a backup of the shell rc file when it is rewritten",
+    )
+    return parser
+
+
+def _configure_logging(debug: bool = False) -> None:
+    """Install the stderr log handler; INFO messages only when debugging."""
+    logging.basicConfig(
+        level=logging.INFO if debug else logging.WARNING,
+        format="%(levelname)s: %(message)s",
+    )
+
+
+def parse_args(
+    argv: Optional[List[str]] = None,
+) -> Union["argparse.Namespace", SimpleNamespace]:
+    """Parse command-line arguments.
+
+    An empty argument list returns the defaults without importing argparse,
+    which keeps the common ``eval "$(awspick)"`` invocation cheap.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        return _default_args()
+    return _build_parser().parse_args(argv)
 
 
 def get_profile_selection(profiles: List[str]) -> Optional[str]:
@@ -91,6 +154,11 @@ def get_profile_selection(profiles: List[str]) -> Optional[str]:
         The function will continue to prompt until a valid selection is made
         or the user explicitly cancels the operation.
     """
+    from aws_pick.config import build_profile_index, validate_profile_selection
+
+    # Build the lookup once so retries don't rescan the profile list
+    index = build_profile_index(profiles)
+
     while True:
         try:
             print("Enter profile number or name: ", end="", file=sys.stderr, flush=True)
@@ -102,11 +170,11 @@ def get_profile_selection(profiles: List[str]) -> Optional[str]:
                 return None
 
             # Allow user to cancel
-            if selection.lower() in ("q", "quit", "exit"):
+            if selection.lower() in _QUIT_COMMANDS:
                 logger.info("User cancelled profile selection")
                 return None
 
-            profile = validate_profile_selection(selection, profiles)
+            profile = validate_profile_selection(selection, profiles, index)
             if profile:
                 return profile
 
@@ -134,16 +202,43 @@ def main(argv: Optional[List[str]] = None) -> int:
     4. Updates shell configuration with the selected profile
     """
 
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Answer a bare --help without constructing the argparse parser
+    if argv in (["-h"], ["--help"]):
+        sys.stdout.write(HELP_TEXT)
+        return 0
+
+    # Parse args first so usage errors exit before heavy imports
+    args = parse_args(argv)
+
     try:
+        # Deferred imports keep `awspick --help` from loading rich and friends
+        from aws_pick.config import (
+            compile_profile_filter,
+            display_profiles,
+            env_flag,
+            get_grouped_profiles,
+            read_aws_profiles,
+        )
+        from aws_pick.shell import (
+            detect_shell,
+            get_current_profile,
+            get_rc_path,
+            update_aws_profile,
+            write_shared_profile,
+        )
+
+        _configure_logging(debug=env_flag("AWSPICK_DEBUG"))
+
         # Read AWS profiles
         profiles = read_aws_profiles()
         if not profiles:
             logger.error("No AWS profiles found. Please check your AWS configuration.")
             return 1
 
-        # Parse args and env for filtering
-        args = parse_args(argv)
-
+        # Resolve filtering options from args and env
         def _split_csv_many(values: Optional[List[str]]) -> List[str]:
             parts: List[str] = []
             if not values:
@@ -154,16 +249,13 @@ def main(argv: Optional[List[str]] = None) -> int:
                 parts.extend([p.strip() for p in v.split(",") if p.strip()])
             return parts
 
-        env_filter = os.environ.get("AWSPICK_FILTER")
-        env_exclude = os.environ.get("AWSPICK_EXCLUDE")
-        env_groups = os.environ.get("AWSPICK_GROUPS_SHOW")
-        env_rules = os.environ.get("AWSPICK_GROUP_RULES")
-        env_regex = os.environ.get("AWSPICK_REGEX", "0").lower() in {"1", "true", "yes"}
-        env_case = os.environ.get("AWSPICK_CASE_SENSITIVE", "0").lower() in {
-            "1",
-            "true",
-            "yes",
-        }
+        env = os.environ
+        env_filter = env.get("AWSPICK_FILTER")
+        env_exclude = env.get("AWSPICK_EXCLUDE")
+        env_groups = env.get("AWSPICK_GROUPS_SHOW")
+        env_rules = env.get("AWSPICK_GROUP_RULES")
+        env_regex = env_flag("AWSPICK_REGEX")
+        env_case = env_flag("AWSPICK_CASE_SENSITIVE")
 
         include_patterns = _split_csv_many(args.filter) or (
             [p.strip() for p in env_filter.split(",")] if env_filter else []
@@ -180,15 +272,20 @@ def main(argv: Optional[List[str]] = None) -> int:
         use_regex = args.regex or env_regex
         case_sensitive = args.case_sensitive or env_case
 
+        # Compile filters once into a single predicate
+        profile_filter = compile_profile_filter(
+            include_patterns or None,
+            exclude_patterns or None,
+            regex=use_regex,
+            case_sensitive=case_sensitive,
+        )
+
         # Group and sort profiles for display, with optional filters
         grouped_profiles = get_grouped_profiles(
             profiles,
             group_rules=group_rules,
             show_groups=groups_to_show,
-            include=include_patterns or None,
-            exclude=exclude_patterns or None,
-            regex=use_regex,
-            case_sensitive=case_sensitive,
+            profile_filter=profile_filter,
         )
         current_profile = get_current_profile()
         display_profiles(grouped_profiles, current_profile=current_profile)
@@ -209,38 +306,40 @@ def main(argv: Optional[List[str]] = None) -> int:
         rc_path, shell_config = get_rc_path(shell_name)
 
         # Update shell configuration
-        success, backup_path = update_aws_profile(profile, shell_name)
+        backup = not (args.no_backup or env_flag("AWSPICK_NO_BACKUP"))
+        success, backup_path = update_aws_profile(profile, shell_name, backup=backup)
         if not success:
             logger.error("Failed to update AWS profile.")
             return 1
 
+        # Collect status lines and emit them with a single write
+        messages: List[str] = []
         if backup_path:
-            print(f"Backup created at {backup_path}", file=sys.stderr)
+            messages.append(f"Backup created at {backup_path}")
 
-        print(f"Updated {rc_path} with AWS_PROFILE={profile}", file=sys.stderr)
+        messages.append(f"Updated {rc_path} with AWS_PROFILE={profile}")
 
         shared_path = write_shared_profile(profile)
         if shared_path:
-            print(f"Updated shared profile at {shared_path}", file=sys.stderr)
+            messages.append(f"Updated shared profile at {shared_path}")
         else:
-            print(
-                "Warning: failed to write shared profile file; other shells may not sync.",
-                file=sys.stderr,
+            messages.append(
+                "Warning: failed to write shared profile file; other shells may not sync."
             )
+        messages.append("Run 'eval \"$(awspick)\"' to apply in the current shell")
 
-        export_cmd = generate_export_command(profile, shell_name)
+        # Reuse the resolved shell config instead of resolving it again
+        export_cmd = shell_config.get_profile_line(profile)
 
         # Always print the export command so the user can eval the output
-        print(export_cmd)
-        print(
-            "Run 'eval \"$(awspick)\"' to apply in the current shell",
-            file=sys.stderr,
-        )
+        sys.stdout.write(f"{export_cmd}\n")
+        sys.stdout.flush()
+        sys.stderr.write("\n".join(messages) + "\n")
 
         return 0
 
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        logger.error("An unexpected error occurred: %s", e, exc_info=True)
         return 1
 
 
@@ -5,28 +5,164 @@ This module handles reading and parsing AWS configuration files,
 displaying available profiles, and validating user selections.
 """
 
-import configparser
+import functools
 import logging
+import os
+import re
 import sys
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-
-from rich.console import Console
-from rich.table import Table
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from rich.console import Console
 
 logger = logging.getLogger(__name__)
 
+# (exact names, lowercase name -> first matching profile)
+ProfileIndex = Tuple[FrozenSet[str], Dict[str, str]]
+
+ProfileFilter = Callable[[str], bool]
+
+_TRUTHY_VALUES = frozenset(("1", "true", "yes", "on"))
+
+# (header, style, justify) for each column of the rich profile table
+_TABLE_COLUMNS = (
+    ("No.", "cyan", "right"),
+    ("Profile", "white", "left"),
+    ("Group", "white", "left"),
+    ("Current", "white", "center"),
+)
+
+# (group name, keywords); a "*" keyword marks the catch-all group
+GroupRule = Tuple[str, Sequence[str]]
+
+_DEFAULT_GROUP_RULES: Tuple[GroupRule, ...] = (
+    ("prod", ("prod",)),
+    ("stg", ("stg",)),
+    ("dev", ("dev",)),
+    ("preprod", ("preprod",)),
+)
+
+_GROUP_COLORS = {
+    "prod": "bold red",
+    "preprod": "bold green",
+    "stg": "bold orange3",
+    "dev": "bold blue",
+    "others": "bold white",
+}
+
+# Matches "[default]" and "[profile name]" section headers; other sections
+# (e.g. "[sso-session ...]") and all key/value lines are skipped.
+_SECTION_RE = re.compile(
+    rb"^[ \t]*\[(?:profile[ \t]+([^\]\r\n]+?)|(default))[ \t]*\]", re.MULTILINE
+)
 
+
+def env_flag(name: str) -> bool:
+    """
+    Return True if the environment variable is set to a truthy value.
+
+    Args:
+        name (str): Environment variable name
+
+    Returns:
+        bool: True for "1", "true", "yes" or "on" (case-insensitive)
+    """
+    return os.environ.get(name, "").lower() in _TRUTHY_VALUES
+
+
+@functools.lru_cache(maxsize=None)
 def get_aws_config_path() -> Path:
     """
     Get the path to the AWS config file.
 
     Returns:
         Path: Path to the AWS config file (~/.aws/config)
+
+    Note:
+        The path is resolved once per process and reused.
     """
     return Path.home() / ".aws" / "config"
 
 
+@functools.lru_cache(maxsize=None)
+def get_profile_cache_path() -> Path:
+    """
+    Get the path to the parsed profile list cache.
+
+    Returns:
+        Path: Path to the cache file (~/.cache/awspick/profiles.json)
+
+    Note:
+        The path is resolved once per process and reused.
+    """
+    return Path.home() / ".cache" / "awspick" / "profiles.json"
+
+
+def _profile_cache_enabled() -> bool:
+    return not env_flag("AWSPICK_NO_CACHE")
+
+
+def _profile_cache_key(config_path: Path) -> str:
+    st = config_path.stat()
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _load_profile_cache(key: str) -> Optional[List[str]]:
+    """Return cached profiles if the cache was written for ``key``."""
+    import json
+
+    try:
+        with open(get_profile_cache_path(), "r") as f:
+            cached = json.load(f)
+        if cached.get("key") != key:
+            return None
+        profiles = cached.get("profiles")
+        if not isinstance(profiles, list) or not all(
+            isinstance(p, str) for p in profiles
+        ):
+            return None
+        return profiles
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _save_profile_cache(key: str, profiles: List[str]) -> None:
+    """Atomically write the profile cache; failures are not fatal."""
+    import json
+    import tempfile
+
+    cache_path = get_profile_cache_path()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temp name keeps concurrent runs from clobbering each other
+        fd, tmp_name = tempfile.mkstemp(
+            dir=cache_path.parent, prefix=f".{cache_path.name}."
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": key, "profiles": profiles}, f)
+            os.replace(tmp_name, cache_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+    except OSError as e:
+        logger.warning("Failed to write profile cache: %s", e)
+
+
 def read_aws_profiles() -> List[str]:
     """
     Read AWS profiles from the config file.
@@ -37,36 +173,43 @@ def read_aws_profiles() -> List[str]:
     Note:
         Returns an empty list if the config file doesn't exist or has no profiles.
         Handles both default profile and named profiles with "profile " prefix.
+        Results are cached in ~/.cache/awspick keyed by the config file's
+        mtime and size; set AWSPICK_NO_CACHE=1 to bypass the cache.
     """
     config_path = get_aws_config_path()
     if not config_path.exists():
-        logger.error(f"AWS config file not found at {config_path}")
+        logger.error("AWS config file not found at %s", config_path)
         return []
 
     try:
-        config = configparser.ConfigParser()
-        config.read(config_path)
-
-        profiles = []
-        for section in config.sections():
-            # AWS config uses "profile name" format for non-default profiles
-            if section == "default":
-                profiles.append("default")
-            elif section.startswith("profile "):
-                profile_name = section[len("profile ") :]
-                profiles.append(profile_name)
-
-        logger.info(f"Found {len(profiles)} AWS profiles")
-        return sorted(profiles)
-    except configparser.Error as e:
-        logger.error(f"Error parsing AWS config file: {e}")
-        return []
-    except Exception as e:
-        logger.error(f"Unexpected error reading AWS profiles: {e}")
+        cache_key = None
+        if _profile_cache_enabled():
+            cache_key = _profile_cache_key(config_path)
+        if cache_key is not None:
+            cached = _load_profile_cache(cache_key)
+            if cached is not None:
+                logger.info("Found %s AWS profiles (cached)", len(cached))
+                return cached
+
+        data = config_path.read_bytes()
+        # Only section headers matter, so scan for them instead of parsing
+        # every key/value with configparser.
+        profiles = {
+            (m.group(1) or m.group(2)).decode("utf-8")
+            for m in _SECTION_RE.finditer(data)
+        }
+
+        result = sorted(profiles)
+        logger.info("Found %s AWS profiles", len(result))
+        if cache_key is not None:
+            _save_profile_cache(cache_key, result)
+        return result
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error("Error reading AWS config file: %s", e)
         return []
 
 
-def _parse_group_rules(rules: Optional[str]) -> List[Tuple[str, List[str]]]:
+def _parse_group_rules(rules: Optional[str]) -> Sequence[GroupRule]:
     """Parse group rules string into ordered mapping.
 
     Format examples:
@@ -79,17 +222,13 @@ def _parse_group_rules(rules: Optional[str]) -> List[Tuple[str, List[str]]]:
     - ``others`` without ``=``: positional marker for unmatched profiles.
     - ``*`` keyword: catch-all wildcard (allows renaming the default group).
 
-    Returns an ordered list of tuples [(group, [keywords...])].
+    Returns an ordered sequence of tuples [(group, [keywords...])]. The
+    default rules are a shared constant and must not be mutated.
     """
     if not rules:
-        return [
-            ("prod", ["prod"]),
-            ("stg", ["stg"]),
-            ("dev", ["dev"]),
-            ("preprod", ["preprod"]),
-        ]
-
-    ordered: List[Tuple[str, List[str]]] = []
+        return _DEFAULT_GROUP_RULES
+
+    ordered: List[GroupRule] = []
     for part in rules.split(";"):
         part = part.strip()
         if not part:
@@ -110,31 +249,86 @@ def _parse_group_rules(rules: Optional[str]) -> List[Tuple[str, List[str]]]:
     return ordered
 
 
-def _match_any(
-    text: str, patterns: List[str], *, regex: bool, case_sensitive: bool
-) -> bool:
-    import re as _re
+def _is_word_char(char: str) -> bool:
+    """Return True for characters the regex ``\\w`` class matches."""
+    return char.isalnum() or char == "_"
 
-    flags = 0 if case_sensitive else _re.IGNORECASE
-    if regex:
-        return any(_re.search(p, text, flags=flags) is not None for p in patterns)
-    if not case_sensitive:
-        text = text.lower()
-        patterns = [p.lower() for p in patterns]
-    return any(p in text for p in patterns)
 
+def _token_contains(text: str, keyword: str) -> bool:
+    """Return True if ``keyword`` occurs in ``text`` as a whole token.
+
+    Each side of a hit must be the string edge, a ``-`` or ``_``, or a word
+    boundary as the regex ``\\b`` defines it. For alphanumeric keywords that
+    means a non-alphanumeric neighbour, so ``prod`` matches ``foo-prod`` and
+    ``a.prod.b`` but not ``preprod`` or ``production``; ``-prod`` still
+    matches ``foo-prod``. Both arguments must already be lowercased.
+    """
+    klen = len(keyword)
+    if not klen:
+        return False
+    first_is_word = _is_word_char(keyword[0])
+    last_is_word = _is_word_char(keyword[-1])
+    tlen = len(text)
+    i = text.find(keyword)
+    while i != -1:
+        end = i + klen
+        if (
+            i == 0 or text[i - 1] in "-_" or _is_word_char(text[i - 1]) != first_is_word
+        ) and (
+            end == tlen or text[end] in "-_" or _is_word_char(text[end]) != last_is_word
+        ):
+            return True
+        i = text.find(keyword, i + 1)
+    return False
+
+
+def compile_profile_filter(
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    *,
+    regex: bool = False,
+    case_sensitive: bool = False,
+) -> Optional[ProfileFilter]:
+    """Build a single predicate that applies include and exclude patterns.
 
-def _match_group_keyword(text: str, keyword: str) -> bool:
-    """Match group keyword on token boundaries to avoid partial collisions.
+    Each regex pattern is compiled once on its own, so inline flags, group
+    names and backreferences keep their meaning; substring patterns are
+    case-folded once up front.
 
-    Examples:
-    - Matches: "foo-prod", "prod", "prod-bar", "bar_prod" (prod as token)
-    - Does not match: "preprod", "production" (prod is a substring only)
+    Returns:
+        Optional[ProfileFilter]: Predicate returning True for profiles to
+        keep, or None when there is nothing to filter.
     """
-    import re as _re
+    if not include and not exclude:
+        return None
+
+    if regex:
+        flags = 0 if case_sensitive else re.IGNORECASE
+
+        def _compile(patterns: Optional[List[str]]) -> Tuple[Callable, ...]:
+            return tuple(re.compile(p, flags).search for p in patterns or ())
 
-    pattern = rf"(^|\b|[-_]){_re.escape(keyword)}($|\b|[-_])"
-    return _re.search(pattern, text, flags=_re.IGNORECASE) is not None
+        inc_searches = _compile(include)
+        exc_searches = _compile(exclude)
+
+        def _keep_regex(profile: str) -> bool:
+            if inc_searches and not any(s(profile) for s in inc_searches):
+                return False
+            return not any(s(profile) for s in exc_searches)
+
+        return _keep_regex
+
+    fold = (lambda s: s) if case_sensitive else str.lower
+    inc_lits = tuple(fold(p) for p in include or ())
+    exc_lits = tuple(fold(p) for p in exclude or ())
+
+    def _keep_substring(profile: str) -> bool:
+        text = fold(profile)
+        if inc_lits and not any(p in text for p in inc_lits):
+            return False
+        return not any(p in text for p in exc_lits)
+
+    return _keep_substring
 
 
 def filter_profiles(
@@ -149,21 +343,15 @@ def filter_profiles(
 
     - include: only keep profiles matching any pattern
     - exclude: drop profiles matching any pattern
+
+    Patterns are compiled once via ``compile_profile_filter``.
     """
-    result = list(profiles)
-    if include:
-        result = [
-            p
-            for p in result
-            if _match_any(p, include, regex=regex, case_sensitive=case_sensitive)
-        ]
-    if exclude:
-        result = [
-            p
-            for p in result
-            if not _match_any(p, exclude, regex=regex, case_sensitive=case_sensitive)
-        ]
-    return result
+    keep = compile_profile_filter(
+        include, exclude, regex=regex, case_sensitive=case_sensitive
+    )
+    if keep is None:
+        return list(profiles)
+    return [p for p in profiles if keep(p)]
 
 
 def get_grouped_profiles(
@@ -175,6 +363,7 @@ def get_grouped_profiles(
     exclude: Optional[List[str]] = None,
     regex: bool = False,
     case_sensitive: bool = False,
+    profile_filter: Optional[ProfileFilter] = None,
 ) -> List[Tuple[str, str]]:
     """
     Group profiles by user-defined rules and return list of (profile, group).
@@ -187,15 +376,21 @@ def get_grouped_profiles(
         exclude: Exclude patterns (substring or regex)
         regex: Treat include/exclude as regex if True
         case_sensitive: Case sensitivity for matching
+        profile_filter: Precompiled predicate from ``compile_profile_filter``;
+            takes precedence over include/exclude/regex/case_sensitive
     """
     # Apply include/exclude filtering first
-    filtered = filter_profiles(
-        profiles,
-        include=include,
-        exclude=exclude,
-        regex=regex,
-        case_sensitive=case_sensitive,
-    )
+    if profile_filter is None:
+        profile_filter = compile_profile_filter(
+            include, exclude, regex=regex, case_sensitive=case_sensitive
+        )
+
+    # Sort once up front; appending in order keeps every group sorted.
+    # read_aws_profiles() already returns sorted names, so this is O(n).
+    if profile_filter is None:
+        filtered = sorted(profiles)
+    else:
+        filtered = sorted(p for p in profiles if profile_filter(p))
 
     ordered_rules = _parse_group_rules(group_rules)
     group_order = [name for name, _ in ordered_rules]
@@ -205,17 +400,25 @@ def get_grouped_profiles(
     explicit_rules = [(n, kws) for n, kws in ordered_rules if "*" not in kws]
     catchall_name = next((n for n, kws in ordered_rules if "*" in kws), "others")
 
-    groups: Dict[str, List[str]] = {name: [] for name in group_order}
-    groups.setdefault(catchall_name, [])
+    # Lists are only created for groups that actually receive a profile
+    groups: Dict[str, List[str]] = defaultdict(list)
+
+    # Flatten rules into an ordered keyword -> group map. Checking keywords
+    # in rule order preserves "first matching rule wins", and a keyword
+    # repeated in a later rule can never win, so the first one is kept.
+    keyword_groups: Dict[str, str] = {}
+    for name, keywords in explicit_rules:
+        for kw in keywords:
+            keyword_groups.setdefault(kw.lower(), name)
+    keyword_items = list(keyword_groups.items())
 
     for profile in filtered:
-        assigned = False
-        for name, keywords in explicit_rules:
-            if any(_match_group_keyword(profile, kw) for kw in keywords):
+        profile_lower = profile.lower()
+        for kw, name in keyword_items:
+            if _token_contains(profile_lower, kw):
                 groups[name].append(profile)
-                assigned = True
                 break
-        if not assigned:
+        else:
             groups[catchall_name].append(profile)
 
     # Limit to requested groups if specified
@@ -229,71 +432,138 @@ def get_grouped_profiles(
     for grp in group_order:
         if allowed_groups is not None and grp not in allowed_groups:
             continue
-        for profile in sorted(groups[grp]):
+        for profile in groups.get(grp, ()):
             grouped_profiles.append((profile, grp))
     return grouped_profiles
 
 
+@functools.lru_cache(maxsize=None)
+def _stderr_console() -> "Console":
+    """Return the process-wide rich Console bound to stderr."""
+    from rich.console import Console
+
+    return Console(file=sys.stderr)
+
+
+def _use_rich_output() -> bool:
+    """Use rich only for an interactive stderr unless AWSPICK_PLAIN is set."""
+    if env_flag("AWSPICK_PLAIN"):
+        return False
+    try:
+        return sys.stderr.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _display_profiles_plain(
+    grouped_profiles: List[Tuple[str, str]],
+    current_profile_norm: Optional[str],
+) -> None:
+    """Write the profile table as plain text with a single write()."""
+    if not grouped_profiles:
+        sys.stderr.write("No AWS profiles found in ~/.aws/config\n")
+        return
+
+    num_w = max(len("No."), len(str(len(grouped_profiles))))
+    name_w = max(len("Profile"), max(len(p) for p, _ in grouped_profiles))
+    group_w = max(len("Group"), max(len(g) for _, g in grouped_profiles))
+
+    lines = [
+        "AWS Profiles",
+        f"{'No.':>{num_w}}  {'Profile':<{name_w}}  {'Group':<{group_w}}  Current",
+    ]
+    prev_group = None
+    for i, (profile, group_name) in enumerate(grouped_profiles, 1):
+        if prev_group is not None and group_name != prev_group:
+            lines.append("")
+        prev_group = group_name
+        marker = "*" if profile.lower() == current_profile_norm else ""
+        row = f"{i:>{num_w}}  {profile:<{name_w}}  {group_name:<{group_w}}  {marker}"
+        lines.append(row.rstrip())
+    sys.stderr.write("\n".join(lines) + "\n")
+
+
 def display_profiles(
     grouped_profiles: List[Tuple[str, str]],
     current_profile: Optional[str] = None,
 ) -> None:
     """
-    Display available AWS profiles in a tabulated format using rich.
+    Display available AWS profiles in a tabulated format.
+
+    Uses a rich table when stderr is a terminal, and falls back to plain
+    text (without importing rich) for pipes or when AWSPICK_PLAIN=1.
 
     Args:
         grouped_profiles (List[Tuple[str, str]]): List of (profile, group) tuples
         current_profile (Optional[str]): Current AWS profile name, if available
     """
-    console = Console(file=sys.stderr)
+    current_profile_norm = current_profile.lower().strip() if current_profile else None
+
+    if not _use_rich_output():
+        _display_profiles_plain(grouped_profiles, current_profile_norm)
+        return
+
+    from rich.table import Table
+
+    console = _stderr_console()
 
     if not grouped_profiles:
         console.print("[bold red]No AWS profiles found in ~/.aws/config[/bold red]")
         return
 
-    group_colors = {
-        "prod": "bold red",
-        "preprod": "bold green",
-        "stg": "bold orange3",
-        "dev": "bold blue",
-        "others": "bold white",
-    }
-
     table = Table(title="AWS Profiles", style="bold blue")
-    table.add_column("No.", style="cyan", justify="right")
-    table.add_column("Profile", style="white")
-    table.add_column("Group", style="white")
-    table.add_column("Current", style="white", justify="center")
-
-    current_profile_norm = current_profile.lower().strip() if current_profile else None
+    for header, style, justify in _TABLE_COLUMNS:
+        table.add_column(header, style=style, justify=justify)
 
     prev_group = None
-    for i, (profile, group_name) in enumerate(grouped_profiles):
-        if prev_group is not None and group_name != prev_group:
-            table.add_section()
-        prev_group = group_name
-        color = group_colors.get(group_name, "white")
+    group_label = ""
+    for i, (profile, group_name) in enumerate(grouped_profiles, 1):
+        if group_name != prev_group:
+            # Rows arrive grouped, so format each group's label once
+            if prev_group is not None:
+                table.add_section()
+            prev_group = group_name
+            color = _GROUP_COLORS.get(group_name, "white")
+            group_label = f"[{color}]{group_name}[/{color}]"
         is_current = (
             current_profile_norm is not None and profile.lower() == current_profile_norm
         )
         current_marker = "[bold green]*[/bold green]" if is_current else ""
-        table.add_row(
-            str(i + 1),
-            profile,
-            f"[{color}]{group_name}[/{color}]",
-            current_marker,
-        )
+        table.add_row(str(i), profile, group_label, current_marker)
 
     console.print(table)
 
 
-def validate_profile_selection(selection: str, profiles: List[str]) -> Optional[str]:
+def build_profile_index(profiles: List[str]) -> ProfileIndex:
+    """
+    Build lookup tables for resolving profile names in O(1).
+
+    Args:
+        profiles (List[str]): List of available profiles
+
+    Returns:
+        ProfileIndex: Exact-name set and lowercase-to-profile mapping. The
+        first profile wins when several differ only by case.
+    """
+    lower: Dict[str, str] = {}
+    for profile in profiles:
+        lower.setdefault(profile.lower(), profile)
+    return frozenset(profiles), lower
+
+
+def validate_profile_selection(
+    selection: str,
+    profiles: List[str],
+    index: Optional[ProfileIndex] = None,
+) -> Optional[str]:
     """
     Validate the user's profile selection.
 
     Args:
         selection (str): User input (number or profile name)
         profiles (List[str]): List of available profiles
+        index (Optional[ProfileIndex]): Prebuilt index from
+            ``build_profile_index(profiles)``; built on demand if omitted
 
     Returns:
         Optional[str]: Selected profile name or None if invalid
@@ -308,24 +578,30 @@ def validate_profile_selection(selection: str, profiles: List[str]) -> Optional[
 
     # Check if selection is a number
     if selection.isdigit():
-        index = int(selection) - 1
-        if 0 <= index < len(profiles):
-            return profiles[index]
-        else:
-            logger.error(
-                f"Invalid profile number: {selection}. Valid range is 1-{len(profiles)}"
-            )
-            return None
+        count = len(profiles)
+        try:
+            position = int(selection) - 1
+        except ValueError:
+            # isdigit() accepts characters such as "²" that int() rejects
+            position = -1
+        if 0 <= position < count:
+            return profiles[position]
+        logger.error(
+            "Invalid profile number: %s. Valid range is 1-%s", selection, count
+        )
+        return None
+
+    exact, lower = index if index is not None else build_profile_index(profiles)
 
     # Check if selection is a profile name
-    if selection in profiles:
+    if selection in exact:
         return selection
 
     # Check for case-insensitive match as a fallback
-    for profile in profiles:
-        if profile.lower() == selection.lower():
-            logger.info(f"Found case-insensitive match for '{selection}': '{profile}'")
-            return profile
+    profile = lower.get(selection.lower())
+    if profile is not None:
+        logger.info("Found case-insensitive match for '%s': '%s'", selection, profile)
+        return profile
 
-    logger.error(f"Profile '{selection}' not found in available profiles")
+    logger.error("Profile '%s' not found in available profiles", selection)
     return None
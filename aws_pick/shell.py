@@ -6,34 +6,62 @@ This module handles updating the shell configuration files
 to set the AWS_PROFILE environment variable for the selected profile.
 """
 
-import datetime
+import functools
+import heapq
 import logging
+import mmap
 import os
 import re
-import shutil
-import subprocess
+import stat
+import time
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 BACKUP_RETENTION_COUNT = 2
 
+# Lines written for each shell family, filled in by get_profile_line()
+_POSIX_EXPORT_FORMAT = 'export AWS_PROFILE="{profile_name}"'
+_FISH_EXPORT_FORMAT = 'set -gx AWS_PROFILE "{profile_name}"'
+
+# AWS_PROFILE assignment lines, compiled once at import. Whitespace classes
+# stay within the line and the fish value starts and ends on a non-space
+# character, so no two pieces overlap and matching is linear even on very
+# long lines. A trailing \r is checked by lookahead only, keeping CRLF line
+# endings intact when a match is replaced.
+_AWS_PROFILE_RE = re.compile(
+    r"^export[ \t]+AWS_PROFILE=([^\r\n]+)(?=\r?$)", re.MULTILINE
+)
+_FISH_AWS_PROFILE_RE = re.compile(
+    r'^set -[gxU]+ AWS_PROFILE[ \t]+["\']?([^"\'\s](?:[^"\'\r\n]*[^"\'\s])?)'
+    r'["\']?[ \t]*(?=\r?$)',
+    re.MULTILINE,
+)
+# Comment written above AWS_PROFILE lines appended by update_aws_profile
+_APPENDED_MARKER = b"# Added by AWS Pick"
+# Bytes twins for scanning memory-mapped rc files without decoding them
+_AWS_PROFILE_BYTES_RE = re.compile(_AWS_PROFILE_RE.pattern.encode(), re.MULTILINE)
+_FISH_AWS_PROFILE_BYTES_RE = re.compile(
+    _FISH_AWS_PROFILE_RE.pattern.encode(), re.MULTILINE
+)
+
+
+class ShellConfig(NamedTuple):
+    """
+    Shell configuration class to handle different shell types.
 
-class ShellConfig:
-    """Shell configuration class to handle different shell types."""
+    Instances are immutable because get_shell_configs() shares them across
+    the whole process.
 
-    def __init__(self, name: str, rc_path: Path, export_format: str):
-        """
-        Initialize a shell configuration.
+    Attributes:
+        name (str): Name of the shell (e.g., "bash", "zsh", "fish")
+        rc_path (Path): Path to the shell's rc file
+        export_format (str): Format string for exporting variables in this shell
+    """
 
-        Args:
-            name (str): Name of the shell (e.g., "bash", "zsh", "fish")
-            rc_path (Path): Path to the shell's rc file
-            export_format (str): Format string for exporting variables in this shell
-        """
-        self.name = name
-        self.rc_path = rc_path
-        self.export_format = export_format
+    name: str
+    rc_path: Path
+    export_format: str
 
     def get_profile_line(self, profile_name: str) -> str:
         """
@@ -55,32 +83,84 @@ class ShellConfig:
             re.Pattern: Compiled regex pattern
         """
         if self.name == "fish":
-            return re.compile(
-                r'^set -[gx] AWS_PROFILE\s+["\']?(.+?)["\']?\s*$', re.MULTILINE
-            )
+            return _FISH_AWS_PROFILE_RE
+        else:
+            return _AWS_PROFILE_RE
+
+    def get_profile_bytes_pattern(self) -> "re.Pattern[bytes]":
+        """
+        Get the bytes version of get_profile_pattern() for raw-bytes scans.
+
+        Returns:
+            re.Pattern[bytes]: Compiled bytes regex pattern
+        """
+        if self.name == "fish":
+            return _FISH_AWS_PROFILE_BYTES_RE
         else:
-            return re.compile(r"^export\s+AWS_PROFILE=(.+)$", re.MULTILINE)
+            return _AWS_PROFILE_BYTES_RE
+
+    def get_profile_prefix(self) -> str:
+        """
+        Get the literal prefix every AWS_PROFILE line starts with.
+
+        Returns:
+            str: Cheap ``str.startswith`` pre-check for get_profile_pattern()
+        """
+        return "set -" if self.name == "fish" else "export"
+
+
+def _read_proc_comm(pid: int) -> Optional[str]:
+    """
+    Read a process name from procfs without spawning ``ps``.
+
+    Args:
+        pid (int): Process ID
+
+    Returns:
+        Optional[str]: Process name, or None where /proc is unavailable
+    """
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
 
 
+@functools.lru_cache(maxsize=1)
 def detect_shell() -> str:
     """
     Detect the current shell.
 
     Returns:
         str: Name of the current shell (e.g., "bash", "zsh", "fish")
+
+    Note:
+        On Linux the parent process name is read from /proc; ``ps`` is only
+        spawned elsewhere (e.g. macOS). The result is cached for the life of
+        the process, so that fallback runs at most once. Use
+        ``detect_shell.cache_clear()`` to re-detect.
     """
     # Try to get from SHELL environment variable
     shell_path = os.environ.get("SHELL", "")
     if shell_path:
         shell_name = os.path.basename(shell_path)
-        logger.info(f"Detected shell from SHELL env var: {shell_name}")
+        logger.info("Detected shell from SHELL env var: %s", shell_name)
         return shell_name
 
     # Fallback to process inspection
+    ppid = os.getppid()
+    shell_name = _read_proc_comm(ppid)
+    if shell_name:
+        logger.info("Detected shell from /proc: %s", shell_name)
+        return shell_name
+
     try:
+        # Only needed off Linux, so keep it out of the import path
+        import subprocess
+
         # Get the parent process name
         result = subprocess.run(
-            ["ps", "-p", str(os.getppid()), "-o", "comm="],
+            ["ps", "-p", str(ppid), "-o", "comm="],
             capture_output=True,
             text=True,
             check=True,
@@ -88,33 +168,31 @@ def detect_shell() -> str:
         shell_name = result.stdout.strip()
         if "/" in shell_name:
             shell_name = os.path.basename(shell_name)
-        logger.info(f"Detected shell from parent process: {shell_name}")
+        logger.info("Detected shell from parent process: %s", shell_name)
         return shell_name
     except Exception as e:
-        logger.warning(f"Failed to detect shell: {e}")
+        logger.warning("Failed to detect shell: %s", e)
         # Default to bash as fallback
         return "bash"
 
 
+@functools.lru_cache(maxsize=1)
 def get_shell_configs() -> Dict[str, ShellConfig]:
     """
     Get configurations for supported shells.
 
     Returns:
         Dict[str, ShellConfig]: Dictionary of shell configurations
+
+    Note:
+        The mapping is built once per process and shared; do not mutate it.
     """
     home = Path.home()
     return {
-        "bash": ShellConfig(
-            "bash", home / ".bashrc", 'export AWS_PROFILE="{profile_name}"'
-        ),
-        "zsh": ShellConfig(
-            "zsh", home / ".zshrc", 'export AWS_PROFILE="{profile_name}"'
-        ),
+        "bash": ShellConfig("bash", home / ".bashrc", _POSIX_EXPORT_FORMAT),
+        "zsh": ShellConfig("zsh", home / ".zshrc", _POSIX_EXPORT_FORMAT),
         "fish": ShellConfig(
-            "fish",
-            home / ".config" / "fish" / "config.fish",
-            'set -gx AWS_PROFILE "{profile_name}"',
+            "fish", home / ".config" / "fish" / "config.fish", _FISH_EXPORT_FORMAT
         ),
         # Add more shells as needed
     }
@@ -140,20 +218,24 @@ def get_rc_path(shell_name: str = None) -> Tuple[Path, ShellConfig]:
     for name in shell_configs:
         if normalized_name.startswith(name):
             shell_config = shell_configs[name]
-            logger.info(f"Using {name} configuration at {shell_config.rc_path}")
+            logger.info("Using %s configuration at %s", name, shell_config.rc_path)
             return shell_config.rc_path, shell_config
 
     # Fallback to bash if shell not recognized
-    logger.warning(f"Shell '{shell_name}' not recognized, falling back to bash")
+    logger.warning("Shell '%s' not recognized, falling back to bash", shell_name)
     return shell_configs["bash"].rc_path, shell_configs["bash"]
 
 
+@functools.lru_cache(maxsize=1)
 def get_shared_profile_path() -> Path:
     """
     Get the shared profile path used for cross-shell synchronization.
 
     Returns:
         Path: Path to the shared profile file
+
+    Note:
+        The path is resolved once per process and reused.
     """
     return Path.home() / ".config" / "awspick" / "profile"
 
@@ -175,13 +257,86 @@ def write_shared_profile(profile_name: str) -> Optional[Path]:
         with open(tmp_path, "w") as f:
             f.write(f"{profile_name}\n")
         os.replace(tmp_path, shared_path)
-        logger.info(f"Wrote shared profile to {shared_path}")
+        logger.info("Wrote shared profile to %s", shared_path)
         return shared_path
     except Exception as e:
-        logger.error(f"Failed to write shared profile file: {e}", exc_info=True)
+        logger.error("Failed to write shared profile file: %s", e, exc_info=True)
         return None
 
 
+def _profile_line_present(rc_path: Path, profile_line: str) -> bool:
+    """
+    Quickly check whether ``profile_line`` is the rc file's AWS_PROFILE line.
+
+    Args:
+        rc_path (Path): Shell rc file
+        profile_line (str): Exact line as produced by get_profile_line()
+
+    Returns:
+        bool: True only if the line appears on its own line and no earlier
+        text mentions AWS_PROFILE; False means "unknown, do the full scan".
+
+    Note:
+        The file is memory-mapped, so only the pages up to the hit are read.
+    """
+    needle = profile_line.encode("utf-8")
+    try:
+        with open(rc_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = mm.find(needle)
+                while pos != -1:
+                    end = pos + len(needle)
+                    at_line_start = pos == 0 or mm[pos - 1 : pos] == b"\n"
+                    at_line_end = end == len(mm) or mm[end : end + 1] in (b"\n", b"\r")
+                    if at_line_start and at_line_end:
+                        # Only trust the hit if it is the first AWS_PROFILE line
+                        return mm.find(b"AWS_PROFILE", 0, pos) == -1
+                    pos = mm.find(needle, end)
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """
+    Atomically replace a file's content via a temp file and os.replace.
+
+    Args:
+        path (Path): File to write. Symlinks are followed so dotfile links
+            keep pointing at the (updated) target.
+        data (bytes): New file content
+
+    Note:
+        The data is written with raw os.write calls. The existing file mode
+        is preserved. On failure the original file is left
+        untouched and the temp file is removed.
+    """
+    import tempfile
+
+    target = path.resolve()
+    view = memoryview(data)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    try:
+        try:
+            # Raw os.write skips the text layer; loop in case of short writes
+            while view:
+                view = view[os.write(fd, view) :]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if target.exists():
+            os.chmod(tmp_name, stat.S_IMODE(target.stat().st_mode))
+        os.replace(tmp_name, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
 def backup_rc_file(rc_path: Path) -> Path:
     """
     Create a backup of the shell rc file.
@@ -194,28 +349,41 @@ def backup_rc_file(rc_path: Path) -> Path:
 
     Note:
         Creates a timestamped backup with format ~/.rcfile.bak-YYYYMMDDHHMMSS
-        Preserves file permissions and metadata using shutil.copy2
+        The backup is a hardlink to the current rc file, which is safe because
+        updates swap in a new inode via os.replace. Falls back to shutil.copy2
+        (which also preserves permissions and metadata) when linking fails.
     """
     try:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        timestamp = time.strftime("%Y%m%d%H%M%S")
         backup_path = Path(f"{rc_path}.bak-{timestamp}")
 
-        shutil.copy2(rc_path, backup_path)
-        logger.info(f"Backup created at {backup_path}")
-
-        # Rotate old backups, keep only BACKUP_RETENTION_COUNT
-        backups = sorted(rc_path.parent.glob(f"{rc_path.name}.bak-*"))
-        if len(backups) > BACKUP_RETENTION_COUNT:
-            for old_backup in backups[:-BACKUP_RETENTION_COUNT]:
+        try:
+            os.link(rc_path, backup_path)
+        except OSError:
+            # Cross-device, unsupported filesystem or an existing backup name
+            import shutil
+
+            shutil.copy2(rc_path, backup_path)
+        logger.info("Backup created at %s", backup_path)
+
+        # Rotate old backups, keep only BACKUP_RETENTION_COUNT. Timestamps
+        # sort lexicographically, so names alone decide which are oldest.
+        backup_prefix = f"{rc_path.name}.bak-"
+        with os.scandir(rc_path.parent) as entries:
+            backups = [e.name for e in entries if e.name.startswith(backup_prefix)]
+        excess = len(backups) - BACKUP_RETENTION_COUNT
+        if excess > 0:
+            for old_name in heapq.nsmallest(excess, backups):
+                old_backup = rc_path.parent / old_name
                 try:
                     old_backup.unlink()
-                    logger.info(f"Removed old backup {old_backup}")
+                    logger.info("Removed old backup %s", old_backup)
                 except OSError as e:
-                    logger.warning(f"Failed to remove old backup {old_backup}: {e}")
+                    logger.warning("Failed to remove old backup %s: %s", old_backup, e)
 
         return backup_path
     except Exception as e:
-        logger.error(f"Failed to create backup: {e}")
+        logger.error("Failed to create backup: %s", e)
         raise
 
 
@@ -241,22 +409,32 @@ def get_current_profile(shell_name: str = None) -> Optional[str]:
         return None
 
     try:
-        with open(rc_path, "r") as f:
-            content = f.read()
-
-        match = shell_config.get_profile_pattern().search(content)
-        if not match:
-            return None
-
-        profile = match.group(1).strip().strip("\"'")
+        # Scan the mapped bytes and decode only the captured value
+        with open(rc_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pattern = shell_config.get_profile_bytes_pattern()
+                # Every match contains AWS_PROFILE, so the regex can start at
+                # the line holding its first mention; an absent variable
+                # skips the regex entirely
+                first = mm.find(b"AWS_PROFILE")
+                if first == -1:
+                    return None
+                match = pattern.search(mm, mm.rfind(b"\n", 0, first) + 1)
+                if not match:
+                    return None
+                value = match.group(1).decode("utf-8", errors="replace")
+
+        profile = value.strip().strip("\"'")
         return profile or None
     except Exception as e:
-        logger.warning(f"Failed to read current AWS_PROFILE from {rc_path}: {e}")
+        logger.warning("Failed to read current AWS_PROFILE from %s: %s", rc_path, e)
         return None
 
 
 def update_aws_profile(
-    profile_name: str, shell_name: str = None
+    profile_name: str, shell_name: str = None, backup: bool = True
 ) -> Tuple[bool, Optional[Path]]:
     """
     Update the AWS_PROFILE environment variable in the shell rc file.
@@ -264,6 +442,8 @@ def update_aws_profile(
     Args:
         profile_name (str): AWS profile name to set
         shell_name (str, optional): Shell name. If None, auto-detect.
+        backup (bool): Back up the rc file before rewriting it. The rewrite is
+            atomic either way.
 
     Returns:
         Tuple[bool, Optional[Path]]: Success status and backup path if created
@@ -271,6 +451,7 @@ def update_aws_profile(
     Note:
         - Returns (True, None) if profile is already set (no changes made)
         - Returns (True, Path) if profile was updated successfully
+        - Returns (True, None) if profile was updated with backup=False
         - Returns (False, None) if an error occurred
 
     This function ensures idempotency by checking if the profile is already set
@@ -284,76 +465,111 @@ def update_aws_profile(
             rc_path.parent.mkdir(parents=True, exist_ok=True)
             with open(rc_path, "w") as f:
                 f.write("# Created by AWS Pick\n\n")
-            logger.info(f"Created new config file at {rc_path}")
+            logger.info("Created new config file at %s", rc_path)
         else:
-            logger.error(f"Shell config file not found at {rc_path}")
+            logger.error("Shell config file not found at %s", rc_path)
             return False, None
 
     try:
-        # Read the current content
-        with open(rc_path, "r") as f:
-            content = f.read()
-
-        # Check if AWS_PROFILE is already set to the same value
-        aws_profile_pattern = shell_config.get_profile_pattern()
-        match = aws_profile_pattern.search(content)
-
-        # Extract current profile value if it exists
-        current_profile = None
-        if match:
-            current_profile = match.group(1).strip("\"'")
+        profile_line = shell_config.get_profile_line(profile_name)
+        line_bytes = profile_line.encode("utf-8")
 
-        if current_profile == profile_name:
-            logger.info(f"AWS_PROFILE already set to {profile_name}, no changes needed")
-            return True, None
-
-        # Create backup
-        backup_path = backup_rc_file(rc_path)
+        if rc_path.stat().st_size == 0:
+            # Nothing to scan in an empty file, go straight to appending
+            content, match, current_profile = b"", None, None
+        else:
+            # Fast path: the exact line we would write is already the active one
+            if _profile_line_present(rc_path, profile_line):
+                logger.info(
+                    "AWS_PROFILE already set to %s, no changes needed", profile_name
+                )
+                return True, None
+
+            # Work on raw bytes: only the ASCII AWS_PROFILE line is touched,
+            # so the rest of the file never needs a decode/encode round trip
+            aws_profile_pattern = shell_config.get_profile_bytes_pattern()
+            prefix = shell_config.get_profile_prefix().encode()
+
+            with open(rc_path, "rb") as f:
+                # Scan line by line so the common "already set" case can stop at
+                # the first AWS_PROFILE line without reading the rest of the file
+                match = None
+                head: List[bytes] = []
+                line_start = 0
+                for line in f:
+                    head.append(line)
+                    if line.startswith(prefix) and b"AWS_PROFILE" in line:
+                        match = aws_profile_pattern.search(line)
+                        if match:
+                            break
+                    line_start += len(line)
+
+                # Extract current profile value if it exists
+                current_profile = None
+                if match:
+                    current_profile = (
+                        match.group(1)
+                        .strip()
+                        .strip(b"\"'")
+                        .decode("utf-8", errors="replace")
+                    )
+
+                if current_profile == profile_name:
+                    logger.info(
+                        "AWS_PROFILE already set to %s, no changes needed", profile_name
+                    )
+                    return True, None
+
+                # A rewrite is needed, so materialize the full content
+                content = b"".join(head) + f.read()
 
         # Update or add AWS_PROFILE
         if match:
-            # Replace existing AWS_PROFILE
-            new_content = aws_profile_pattern.sub(
-                shell_config.get_profile_line(profile_name), content
-            )
+            if content.count(b"AWS_PROFILE") == 1:
+                # The matched line is the only mention, so splice the new line
+                # in at its known offset instead of running another pass
+                start = line_start + match.start()
+                end = line_start + match.end()
+                new_content = content[:start] + line_bytes + content[end:]
+            else:
+                # Replace every assignment; a callable keeps the line literal
+                # so backslashes in profile names are not parsed as group refs
+                new_content = aws_profile_pattern.sub(lambda _m: line_bytes, content)
             logger.info(
-                f"Replacing existing AWS_PROFILE={current_profile} with {profile_name}"
+                "Replacing existing AWS_PROFILE=%s with %s",
+                current_profile,
+                profile_name,
             )
         else:
             # Add AWS_PROFILE at the end
             new_content = (
                 content.rstrip()
-                + f"\n\n# Added by AWS Pick\n{shell_config.get_profile_line(profile_name)}\n"
+                + b"\n\n"
+                + _APPENDED_MARKER
+                + b"\n"
+                + line_bytes
+                + b"\n"
             )
-            logger.info(f"Adding new AWS_PROFILE={profile_name} entry")
+            logger.info("Adding new AWS_PROFILE=%s entry", profile_name)
 
-        # Write the updated content
-        with open(rc_path, "w") as f:
-            f.write(new_content)
+        if new_content == content:
+            logger.info("%s already up to date, no changes needed", rc_path)
+            return True, None
 
-        logger.info(f"Successfully updated {rc_path} with AWS_PROFILE={profile_name}")
+        # Back up right before replacing, then swap the file in atomically
+        backup_path = backup_rc_file(rc_path) if backup else None
+        _atomic_write_bytes(rc_path, new_content)
+
+        logger.info(
+            "Successfully updated %s with AWS_PROFILE=%s", rc_path, profile_name
+        )
         return True, backup_path
 
     except Exception as e:
-        logger.error(f"Failed to update AWS profile: {e}", exc_info=True)
+        logger.error("Failed to update AWS profile: %s", e, exc_info=True)
         return False, None
 
 
-def source_rc_file(shell_config: ShellConfig) -> bool:
-    """Source the rc file for the detected shell."""
-
-    try:
-        subprocess.run(
-            [shell_config.name, "-c", f"source {shell_config.rc_path}"],
-            check=True,
-        )
-        logger.info(f"Sourced {shell_config.rc_path} using {shell_config.name}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to source rc file: {e}")
-        return False
-
-
 def generate_export_command(profile_name: str, shell_name: str = None) -> str:
     """Return the shell command to export AWS_PROFILE for the given shell."""
 
@@ -1,10 +1,46 @@
 """Tests for the CLI module."""
 
+import argparse
 import sys
 from unittest.mock import patch
 
 
-from aws_pick.cli import get_profile_selection, main
+from aws_pick.cli import (
+    HELP_TEXT,
+    _build_parser,
+    get_profile_selection,
+    main,
+    parse_args,
+)
+
+
+def test_parse_args_empty_matches_parser_defaults():
+    """The argparse-free fast path must yield the parser's defaults."""
+    assert vars(parse_args([])) == vars(_build_parser().parse_args([]))
+
+
+def test_help_text_lists_every_option():
+    """The hand-written help must mention every visible parser option."""
+    for action in _build_parser()._actions:
+        if action.help == argparse.SUPPRESS:
+            continue
+        for option in action.option_strings:
+            assert option in HELP_TEXT
+
+
+def test_help_text_matches_parser_help(monkeypatch):
+    """The hand-written help is exactly what argparse would print."""
+    monkeypatch.setenv("COLUMNS", "80")
+    assert _build_parser().format_help() == HELP_TEXT
+
+
+@patch("aws_pick.config.read_aws_profiles")
+@patch("sys.stdout.write")
+def test_main_help_skips_parser(mock_write, mock_read_profiles):
+    """--help prints the usage text and exits without reading profiles."""
+    assert main(["--help"]) == 0
+    mock_write.assert_called_once_with(HELP_TEXT)
+    mock_read_profiles.assert_not_called()
 
 
 @patch("builtins.input")
@@ -98,7 +134,7 @@ def test_get_profile_selection_keyboard_interrupt(mock_input):
     mock_input.assert_called_once()
 
 
-@patch("aws_pick.cli.read_aws_profiles")
+@patch("aws_pick.config.read_aws_profiles")
 def test_main_no_profiles(mock_read_profiles):
     """Test main function with no profiles."""
     # Setup mock
@@ -112,10 +148,10 @@ def test_main_no_profiles(mock_read_profiles):
     mock_read_profiles.assert_called_once()
 
 
-@patch("aws_pick.cli.read_aws_profiles")
-@patch("aws_pick.cli.display_profiles")
+@patch("aws_pick.config.read_aws_profiles")
+@patch("aws_pick.config.display_profiles")
 @patch("aws_pick.cli.get_profile_selection")
-@patch("aws_pick.cli.get_current_profile")
+@patch("aws_pick.shell.get_current_profile")
 def test_main_cancelled_selection(
     mock_get_current_profile, mock_get_selection, mock_display, mock_read_profiles
 ):
@@ -135,23 +171,22 @@ def test_main_cancelled_selection(
     mock_get_selection.assert_called_once()
 
 
-@patch("aws_pick.cli.read_aws_profiles")
-@patch("aws_pick.cli.display_profiles")
+@patch("aws_pick.config.read_aws_profiles")
+@patch("aws_pick.config.display_profiles")
 @patch("aws_pick.cli.get_profile_selection")
-@patch("aws_pick.cli.write_shared_profile")
-@patch("aws_pick.cli.update_aws_profile")
-@patch("aws_pick.cli.detect_shell")
-@patch("builtins.print")
-@patch("aws_pick.cli.get_current_profile")
+@patch("aws_pick.shell.write_shared_profile")
+@patch("aws_pick.shell.update_aws_profile")
+@patch("aws_pick.shell.detect_shell")
+@patch("aws_pick.shell.get_current_profile")
 def test_main_successful_update(
     mock_get_current_profile,
-    mock_print,
     mock_detect_shell,
     mock_update,
     mock_write_shared,
     mock_get_selection,
     mock_display,
     mock_read_profiles,
+    capsys,
 ):
     """Test main function with successful update."""
     # Setup mock
@@ -170,18 +205,21 @@ def test_main_successful_update(
     mock_read_profiles.assert_called_once()
     mock_display.assert_called_once()
     mock_get_selection.assert_called_once()
-    mock_update.assert_called_once_with("dev", "bash")
+    mock_update.assert_called_once_with("dev", "bash", backup=True)
     mock_write_shared.assert_called_once_with("dev")
-    assert mock_print.call_count >= 3  # At least 3 print calls
+    err = capsys.readouterr().err
+    assert "Selected profile: dev" in err
+    assert "Backup created at /home/user/.zshrc.bak-20250605060000" in err
+    assert "Updated shared profile at /home/user/.config/awspick/profile" in err
 
 
-@patch("aws_pick.cli.read_aws_profiles")
-@patch("aws_pick.cli.display_profiles")
+@patch("aws_pick.config.read_aws_profiles")
+@patch("aws_pick.config.display_profiles")
 @patch("aws_pick.cli.get_profile_selection")
-@patch("aws_pick.cli.write_shared_profile")
-@patch("aws_pick.cli.update_aws_profile")
-@patch("aws_pick.cli.detect_shell")
-@patch("aws_pick.cli.get_current_profile")
+@patch("aws_pick.shell.write_shared_profile")
+@patch("aws_pick.shell.update_aws_profile")
+@patch("aws_pick.shell.detect_shell")
+@patch("aws_pick.shell.get_current_profile")
 def test_main_failed_update(
     mock_get_current_profile,
     mock_detect_shell,
@@ -207,27 +245,26 @@ def test_main_failed_update(
     mock_read_profiles.assert_called_once()
     mock_display.assert_called_once()
     mock_get_selection.assert_called_once()
-    mock_update.assert_called_once_with("dev", "bash")
+    mock_update.assert_called_once_with("dev", "bash", backup=True)
     mock_write_shared.assert_not_called()
 
 
-@patch("aws_pick.cli.read_aws_profiles")
-@patch("aws_pick.cli.display_profiles")
+@patch("aws_pick.config.read_aws_profiles")
+@patch("aws_pick.config.display_profiles")
 @patch("aws_pick.cli.get_profile_selection")
-@patch("aws_pick.cli.write_shared_profile")
-@patch("aws_pick.cli.update_aws_profile")
-@patch("aws_pick.cli.detect_shell")
-@patch("builtins.print")
-@patch("aws_pick.cli.get_current_profile")
+@patch("aws_pick.shell.write_shared_profile")
+@patch("aws_pick.shell.update_aws_profile")
+@patch("aws_pick.shell.detect_shell")
+@patch("aws_pick.shell.get_current_profile")
 def test_main_outputs_export_command(
     mock_get_current_profile,
-    mock_print,
     mock_detect_shell,
     mock_update,
     mock_write_shared,
     mock_get_selection,
     mock_display,
     mock_read_profiles,
+    capsys,
 ):
     """Test export command is printed by default."""
 
@@ -241,5 +278,32 @@ def test_main_outputs_export_command(
     result = main([])
 
     assert result == 0
-    mock_print.assert_any_call('export AWS_PROFILE="dev"')
+    assert capsys.readouterr().out == 'export AWS_PROFILE="dev"\n'
     mock_write_shared.assert_called_once_with("dev")
+
+
+@patch("aws_pick.config.read_aws_profiles")
+@patch("aws_pick.config.display_profiles")
+@patch("aws_pick.cli.get_profile_selection")
+@patch("aws_pick.shell.write_shared_profile")
+@patch("aws_pick.shell.update_aws_profile")
+@patch("aws_pick.shell.detect_shell")
+@patch("aws_pick.shell.get_current_profile")
+def test_main_no_backup(
+    mock_get_current_profile,
+    mock_detect_shell,
+    mock_update,
+    mock_write_shared,
+    mock_get_selection,
+    mock_display,
+    mock_read_profiles,
+):
+    """--no-backup is passed through to update_aws_profile."""
+    mock_read_profiles.return_value = ["default", "dev"]
+    mock_get_selection.return_value = "dev"
+    mock_update.return_value = (True, None)
+    mock_detect_shell.return_value = "bash"
+    mock_get_current_profile.return_value = None
+
+    assert main(["--no-backup"]) == 0
+    mock_update.assert_called_once_with("dev", "bash", backup=False)
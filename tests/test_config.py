@@ -1,12 +1,18 @@
 """Tests for the config module."""
 
+import json
 import sys
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 
 from aws_pick.config import (
+    _stderr_console,
+    _token_contains,
+    build_profile_index,
+    compile_profile_filter,
     display_profiles,
+    filter_profiles,
     get_aws_config_path,
     get_grouped_profiles,
     read_aws_profiles,
@@ -20,25 +26,73 @@ def test_get_aws_config_path():
     assert get_aws_config_path() == expected_path
 
 
+@patch("aws_pick.config.get_profile_cache_path")
 @patch("aws_pick.config.get_aws_config_path")
-@patch("configparser.ConfigParser")
-def test_read_aws_profiles(mock_configparser, mock_get_path):
+def test_read_aws_profiles(mock_get_path, mock_cache_path, tmp_path):
     """Test reading AWS profiles from config."""
-    # Setup mock
-    mock_config = MagicMock()
-    mock_config.sections.return_value = ["default", "profile dev", "profile prod"]
-    mock_configparser.return_value = mock_config
-
-    mock_path = MagicMock()
-    mock_path.exists.return_value = True
-    mock_get_path.return_value = mock_path
+    config_path = tmp_path / "config"
+    config_path.write_text(
+        "[profile prod]\n"
+        "region = us-east-1\n"
+        "[default]\n"
+        "region = ap-northeast-2\n"
+        "# [profile commented]\n"
+        "[sso-session corp]\n"
+        "sso_start_url = https://example.awsapps.com/start\n"
+        "[profile dev]\n"
+        "sso_session = corp\n"
+    )
+    mock_get_path.return_value = config_path
+    mock_cache_path.return_value = tmp_path / "cache" / "profiles.json"
 
     # Call function
     profiles = read_aws_profiles()
 
     # Assertions
     assert profiles == ["default", "dev", "prod"]
-    mock_config.read.assert_called_once_with(mock_path)
+
+
+@patch("aws_pick.config.get_profile_cache_path")
+@patch("aws_pick.config.get_aws_config_path")
+def test_read_aws_profiles_uses_cache(mock_get_path, mock_cache_path, tmp_path):
+    """Cached profiles are reused until the config file changes."""
+    config_path = tmp_path / "config"
+    config_path.write_text("[profile dev]\n")
+    mock_get_path.return_value = config_path
+    mock_cache_path.return_value = tmp_path / "cache" / "profiles.json"
+
+    assert read_aws_profiles() == ["dev"]
+    assert mock_cache_path.return_value.exists()
+
+    with patch.object(Path, "read_bytes") as mock_read:
+        assert read_aws_profiles() == ["dev"]
+        mock_read.assert_not_called()
+
+    config_path.write_text("[profile dev]\n[profile prod]\n")
+    assert read_aws_profiles() == ["dev", "prod"]
+
+
+@patch("aws_pick.config.get_profile_cache_path")
+@patch("aws_pick.config.get_aws_config_path")
+def test_read_aws_profiles_ignores_malformed_cache(
+    mock_get_path, mock_cache_path, tmp_path
+):
+    """A cache whose profiles are not all strings is reparsed and rewritten."""
+    config_path = tmp_path / "config"
+    config_path.write_text("[profile dev]\n")
+    mock_get_path.return_value = config_path
+    cache_path = tmp_path / "cache" / "profiles.json"
+    mock_cache_path.return_value = cache_path
+
+    assert read_aws_profiles() == ["dev"]
+    cached = json.loads(cache_path.read_text())
+    cached["profiles"] = ["dev", 1]
+    cache_path.write_text(json.dumps(cached))
+
+    assert read_aws_profiles() == ["dev"]
+    assert json.loads(cache_path.read_text())["profiles"] == ["dev"]
+    # The unique temp file is gone once the cache has been replaced
+    assert [p.name for p in cache_path.parent.iterdir()] == ["profiles.json"]
 
 
 @patch("aws_pick.config.get_aws_config_path")
@@ -56,9 +110,11 @@ def test_read_aws_profiles_no_config(mock_get_path):
     assert profiles == []
 
 
-@patch("aws_pick.config.Console")
-def test_display_profiles(mock_console_class):
+@patch("aws_pick.config._use_rich_output", return_value=True)
+@patch("rich.console.Console")
+def test_display_profiles(mock_console_class, _mock_use_rich):
     """Test displaying profiles using rich."""
+    _stderr_console.cache_clear()
     mock_console = MagicMock()
     mock_console_class.return_value = mock_console
 
@@ -67,11 +123,14 @@ def test_display_profiles(mock_console_class):
 
     mock_console_class.assert_called_once_with(file=sys.stderr)
     mock_console.print.assert_called_once()
+    _stderr_console.cache_clear()
 
 
-@patch("aws_pick.config.Console")
-def test_display_profiles_empty(mock_console_class):
+@patch("aws_pick.config._use_rich_output", return_value=True)
+@patch("rich.console.Console")
+def test_display_profiles_empty(mock_console_class, _mock_use_rich):
     """Test displaying profiles when no profiles are found."""
+    _stderr_console.cache_clear()
     mock_console = MagicMock()
     mock_console_class.return_value = mock_console
 
@@ -81,6 +140,29 @@ def test_display_profiles_empty(mock_console_class):
     mock_console.print.assert_called_once_with(
         "[bold red]No AWS profiles found in ~/.aws/config[/bold red]"
     )
+    _stderr_console.cache_clear()
+
+
+@patch("aws_pick.config._use_rich_output", return_value=False)
+@patch("rich.console.Console")
+@patch("sys.stderr")
+def test_display_profiles_plain(mock_stderr, mock_console_class, _mock_use_rich):
+    """Non-interactive output is written as plain text in one call."""
+    grouped_profiles = [("dev", "dev"), ("prod", "prod"), ("default", "others")]
+    display_profiles(grouped_profiles, current_profile="prod")
+
+    mock_console_class.assert_not_called()
+    mock_stderr.write.assert_called_once()
+    output = mock_stderr.write.call_args[0][0]
+    assert output.splitlines() == [
+        "AWS Profiles",
+        "No.  Profile  Group   Current",
+        "  1  dev      dev",
+        "",
+        "  2  prod     prod    *",
+        "",
+        "  3  default  others",
+    ]
 
 
 def test_validate_profile_selection():
@@ -101,6 +183,7 @@ def test_validate_profile_selection():
     assert validate_profile_selection("0", profiles) is None
     assert validate_profile_selection("4", profiles) is None
     assert validate_profile_selection("999", profiles) is None
+    assert validate_profile_selection("\u00b2", profiles) is None
 
     # Test invalid name
     assert validate_profile_selection("staging", profiles) is None
@@ -109,6 +192,18 @@ def test_validate_profile_selection():
     assert validate_profile_selection("", profiles) is None
 
 
+def test_validate_profile_selection_with_index():
+    """Prebuilt index resolves exact and case-insensitive names."""
+    profiles = ["Dev", "dev", "Prod"]
+    index = build_profile_index(profiles)
+
+    assert validate_profile_selection("dev", profiles, index) == "dev"
+    assert validate_profile_selection("DEV", profiles, index) == "Dev"
+    assert validate_profile_selection("prod", profiles, index) == "Prod"
+    assert validate_profile_selection("2", profiles, index) == "dev"
+    assert validate_profile_selection("stg", profiles, index) is None
+
+
 def test_get_grouped_profiles_preprod_vs_prod():
     """preprod가 prod로 오분류되지 않아야 한다."""
     profiles = ["dev-main", "preprod-main", "prod-main", "misc"]
@@ -118,3 +213,69 @@ def test_get_grouped_profiles_preprod_vs_prod():
     assert grouped["prod-main"] == "prod"
     assert grouped["dev-main"] == "dev"
     assert grouped["misc"] == "others"
+
+
+def test_filter_profiles():
+    """Include/exclude patterns are applied once per profile."""
+    profiles = ["api-Prod", "api-dev", "legacy-prod", "tooling-admin", "misc"]
+
+    assert filter_profiles(profiles, include=["prod"]) == ["api-Prod", "legacy-prod"]
+    assert filter_profiles(profiles, include=["prod", "admin"], exclude=["legacy"]) == [
+        "api-Prod",
+        "tooling-admin",
+    ]
+    assert filter_profiles(profiles, exclude=["DEV"]) == [
+        "api-Prod",
+        "legacy-prod",
+        "tooling-admin",
+        "misc",
+    ]
+    assert filter_profiles(
+        profiles, include=[r"-(prod|admin)$"], exclude=[r"^legacy"], regex=True
+    ) == ["api-Prod", "tooling-admin"]
+    assert filter_profiles(profiles, include=["Prod"], case_sensitive=True) == [
+        "api-Prod"
+    ]
+    assert filter_profiles(profiles) == profiles
+    assert compile_profile_filter() is None
+
+
+def test_filter_profiles_regex_patterns_compile_independently():
+    """Inline flags, reused group names and backreferences work per pattern."""
+    assert filter_profiles(
+        ["Prod-x", "dev"], include=["(?i)prod"], regex=True, case_sensitive=True
+    ) == ["Prod-x"]
+    assert filter_profiles(
+        ["api-prod", "ops-dev", "misc"],
+        include=[r"(?P<env>prod)$", r"(?P<env>dev)$"],
+        regex=True,
+    ) == ["api-prod", "ops-dev"]
+    assert filter_profiles(
+        ["aa-x", "ab-x"], include=["nomatch", r"^(a)\1"], regex=True
+    ) == ["aa-x"]
+
+
+def test_get_grouped_profiles_multi_keyword_rules():
+    """Any keyword of a rule assigns the profile; first matching rule wins."""
+    profiles = ["api-production", "api_prod", "preprod-x", "dev-prod", "misc"]
+    grouped = dict(
+        get_grouped_profiles(profiles, group_rules="dev=dev;prod=prod,production")
+    )
+
+    assert grouped["api-production"] == "prod"
+    assert grouped["api_prod"] == "prod"
+    assert grouped["dev-prod"] == "dev"
+    assert grouped["preprod-x"] == "others"
+    assert grouped["misc"] == "others"
+
+
+def test_token_contains_token_boundaries():
+    """Keywords match whole tokens only."""
+    for text in ("foo-prod", "prod", "prod-bar", "bar_prod", "a.prod.b"):
+        assert _token_contains(text, "prod")
+    for text in ("preprod", "production", "reproduce", ""):
+        assert not _token_contains(text, "prod")
+    # Edge characters that are not alphanumeric follow regex \b semantics
+    assert _token_contains("foo-prod", "-prod")
+    assert _token_contains("prod.x", "prod.")
+    assert not _token_contains("a..prod", ".prod")
@@ -1,8 +1,9 @@
 """Tests for the shell module."""
 
 from pathlib import Path
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
+import pytest
 
 from aws_pick.shell import (
     BACKUP_RETENTION_COUNT,
@@ -12,6 +13,7 @@ from aws_pick.shell import (
     generate_export_command,
     get_current_profile,
     get_rc_path,
+    get_shared_profile_path,
     get_shell_configs,
     update_aws_profile,
     write_shared_profile,
@@ -35,29 +37,59 @@ def test_shell_config():
     assert not pattern.search('# export AWS_PROFILE="old-profile"')
 
 
-@patch("aws_pick.shell.os.environ")
-@patch("aws_pick.shell.subprocess.run")
-def test_detect_shell_from_env(mock_run, mock_environ):
+def test_profile_patterns_stay_on_one_line():
+    """Patterns neither span lines nor backtrack on pathological input."""
+    bash = ShellConfig("bash", Path("/home/user/.bashrc"), "").get_profile_pattern()
+    fish = ShellConfig("fish", Path("/home/user/config.fish"), "").get_profile_pattern()
+
+    assert not bash.search("export\nAWS_PROFILE=dev")
+    assert bash.search('export AWS_PROFILE="' + "a" * 10000).group(1).startswith('"a')
+    assert fish.search("set -gx AWS_PROFILE 'dev'").group(1) == "dev"
+    assert fish.search("set -Ux AWS_PROFILE dev  ").group(1) == "dev"
+    assert fish.search('set -gx AWS_PROFILE "my dev"').group(1) == "my dev"
+    # Long whitespace runs around the value used to backtrack quadratically
+    assert not fish.search("set -gx AWS_PROFILE a" + " " * 20000 + '"b')
+    assert not fish.search("set -gx AWS_PROFILE" + " " * 10000 + 'x"y')
+    assert not fish.search("set -gx AWS_PROFILE" + " \t" * 20000)
+
+
+@patch("subprocess.run")
+def test_detect_shell_from_env(mock_run, monkeypatch):
     """Test detecting shell from SHELL environment variable."""
-    # Setup mock
-    mock_environ.get.return_value = "/bin/zsh"
+    detect_shell.cache_clear()
+    monkeypatch.setenv("SHELL", "/bin/zsh")
 
     # Call function
     result = detect_shell()
+    detect_shell.cache_clear()
 
     # Assertions
     assert result == "zsh"
-    mock_environ.get.assert_called_with("SHELL", "")
     mock_run.assert_not_called()
 
 
-@patch("aws_pick.shell.os.environ")
-@patch("aws_pick.shell.subprocess.run")
+@patch("subprocess.run")
+@patch("aws_pick.shell._read_proc_comm", return_value="zsh")
+def test_detect_shell_from_proc(mock_proc_comm, mock_run, monkeypatch):
+    """Test detecting shell from /proc without spawning ps."""
+    detect_shell.cache_clear()
+    monkeypatch.delenv("SHELL", raising=False)
+
+    result = detect_shell()
+    detect_shell.cache_clear()
+
+    assert result == "zsh"
+    mock_run.assert_not_called()
+
+
+@patch("subprocess.run")
+@patch("aws_pick.shell._read_proc_comm", return_value=None)
 @patch("aws_pick.shell.os.getppid")
-def test_detect_shell_from_process(mock_getppid, mock_run, mock_environ):
+def test_detect_shell_from_process(mock_getppid, mock_proc_comm, mock_run, monkeypatch):
     """Test detecting shell from parent process."""
+    detect_shell.cache_clear()
     # Setup mocks
-    mock_environ.get.return_value = ""
+    monkeypatch.delenv("SHELL", raising=False)
     mock_getppid.return_value = 12345
     mock_process = MagicMock()
     mock_process.stdout = "bash\n"
@@ -65,10 +97,10 @@ def test_detect_shell_from_process(mock_getppid, mock_run, mock_environ):
 
     # Call function
     result = detect_shell()
+    detect_shell.cache_clear()
 
     # Assertions
     assert result == "bash"
-    mock_environ.get.assert_called_with("SHELL", "")
     mock_run.assert_called_with(
         ["ps", "-p", "12345", "-o", "comm="], capture_output=True, text=True, check=True
     )
@@ -119,10 +151,9 @@ def test_get_rc_path(mock_detect_shell):
 
 
 @patch("aws_pick.shell.get_rc_path")
-@patch("aws_pick.shell.os.environ")
-def test_get_current_profile_from_env(mock_environ, mock_get_rc_path):
+def test_get_current_profile_from_env(mock_get_rc_path, monkeypatch):
     """Test reading current profile from AWS_PROFILE env var."""
-    mock_environ.get.return_value = "dev"
+    monkeypatch.setenv("AWS_PROFILE", "dev")
 
     result = get_current_profile()
 
@@ -131,50 +162,125 @@ def test_get_current_profile_from_env(mock_environ, mock_get_rc_path):
 
 
 @patch("aws_pick.shell.get_rc_path")
-@patch("aws_pick.shell.os.environ")
-@patch("pathlib.Path.exists", return_value=True)
-@patch(
-    "builtins.open",
-    new_callable=mock_open,
-    read_data='export AWS_PROFILE="prod"\n',
-)
-def test_get_current_profile_from_rc_file(
-    mock_file, mock_exists, mock_environ, mock_get_rc_path
-):
+def test_get_current_profile_from_rc_file(mock_get_rc_path, tmp_path, monkeypatch):
     """Test reading current profile from rc file when env is not set."""
-    mock_environ.get.return_value = ""
-    rc_path = Path("/home/user/.bashrc")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('alias ll="ls -l"\nexport AWS_PROFILE="prod"\n')
     shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
     mock_get_rc_path.return_value = (rc_path, shell_config)
 
     result = get_current_profile("bash")
 
     assert result == "prod"
-    mock_file.assert_called_once_with(rc_path, "r")
 
 
-@patch("aws_pick.shell.shutil.copy2")
-@patch("aws_pick.shell.datetime")
-def test_backup_rc_file(mock_datetime, mock_copy):
+@patch("aws_pick.shell.get_rc_path")
+def test_get_current_profile_appended_line(mock_get_rc_path, tmp_path, monkeypatch):
+    """A profile line appended by AWS Pick is found at the end of a large file."""
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text(
+        "# padding\n" * 1000 + '\n# Added by AWS Pick\nexport AWS_PROFILE="stg"\n'
+    )
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    assert get_current_profile("bash") == "stg"
+
+
+@patch("aws_pick.shell.get_rc_path")
+def test_get_current_profile_earlier_line_beats_appended(
+    mock_get_rc_path, tmp_path, monkeypatch
+):
+    """An earlier user export wins over a marker block near the end of the file."""
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text(
+        'export AWS_PROFILE="prod"\n'
+        + "# padding\n" * 1000
+        + '\n# Added by AWS Pick\nexport AWS_PROFILE="stg"\n'
+    )
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    assert get_current_profile("bash") == "prod"
+
+
+@patch("aws_pick.shell.get_rc_path")
+def test_get_current_profile_fish_crlf(mock_get_rc_path, tmp_path, monkeypatch):
+    """A fish rc file with CRLF line endings still yields its profile."""
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    rc_path = tmp_path / "config.fish"
+    rc_path.write_bytes(b'# Some content\r\nset -gx AWS_PROFILE "my dev"\r\n')
+    shell_config = ShellConfig("fish", rc_path, 'set -gx AWS_PROFILE "{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    assert get_current_profile("fish") == "my dev"
+
+
+@patch("aws_pick.shell.get_rc_path")
+def test_get_current_profile_empty_rc_file(mock_get_rc_path, tmp_path, monkeypatch):
+    """An empty rc file yields no current profile."""
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    rc_path = tmp_path / "config.fish"
+    rc_path.write_text("")
+    shell_config = ShellConfig("fish", rc_path, 'set -gx AWS_PROFILE "{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    assert get_current_profile("fish") is None
+
+
+@patch("aws_pick.shell.time.strftime", return_value="20250605060000")
+def test_backup_rc_file(mock_strftime, tmp_path):
     """Test backing up RC file."""
-    # Setup mocks
-    mock_datetime.datetime.now.return_value.strftime.return_value = "20250605060000"
-    rc_path = Path("/home/user/.bashrc")
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('export AWS_PROFILE="dev"\n')
 
-    # Call function
     result = backup_rc_file(rc_path)
 
-    # Assertions
-    expected_backup = Path("/home/user/.bashrc.bak-20250605060000")
-    assert result == expected_backup
-    mock_copy.assert_called_once_with(rc_path, expected_backup)
+    assert result == tmp_path / ".bashrc.bak-20250605060000"
+    assert result.read_text() == 'export AWS_PROFILE="dev"\n'
 
 
-@patch("aws_pick.shell.shutil.copy2")
-@patch("aws_pick.shell.datetime")
-def test_backup_rc_file_rotates_old_backups(mock_datetime, mock_copy, tmp_path):
+@patch("aws_pick.shell.os.link", side_effect=OSError("cross-device link"))
+@patch("aws_pick.shell.time.strftime", return_value="20250605060000")
+def test_backup_rc_file_copy_fallback(mock_strftime, mock_link, tmp_path):
+    """Without hardlinks the backup is a full copy with the same mode."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('export AWS_PROFILE="dev"\n')
+    rc_path.chmod(0o600)
+
+    result = backup_rc_file(rc_path)
+
+    assert result.read_text() == 'export AWS_PROFILE="dev"\n'
+    assert result.stat().st_ino != rc_path.stat().st_ino
+    assert result.stat().st_mode & 0o777 == 0o600
+
+
+@patch("aws_pick.shell.time.strftime", return_value="20250605060000")
+def test_backup_rc_file_hardlink_survives_update(mock_strftime, tmp_path):
+    """The hardlinked backup keeps the old content after an atomic rewrite."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('export AWS_PROFILE="old"\n')
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+
+    with patch("aws_pick.shell.get_rc_path", return_value=(rc_path, shell_config)):
+        success, backup_path = update_aws_profile("new", "bash")
+
+    assert success is True
+    assert backup_path.read_text() == 'export AWS_PROFILE="old"\n'
+    assert rc_path.read_text() == 'export AWS_PROFILE="new"\n'
+    assert backup_path.stat().st_ino != rc_path.stat().st_ino
+
+
+@patch("aws_pick.shell.os.link", side_effect=OSError("cross-device link"))
+@patch("shutil.copy2")
+@patch("aws_pick.shell.time.strftime", return_value="20250605060000")
+def test_backup_rc_file_rotates_old_backups(
+    mock_strftime, mock_copy, mock_link, tmp_path
+):
     """Test backup rotation keeps only BACKUP_RETENTION_COUNT files."""
-    mock_datetime.datetime.now.return_value.strftime.return_value = "20250605060000"
 
     def _copy_side_effect(_src: Path, dst: Path) -> None:
         Path(dst).write_text("new")
@@ -198,85 +304,132 @@ def test_backup_rc_file_rotates_old_backups(mock_datetime, mock_copy, tmp_path):
 
 @patch("aws_pick.shell.get_rc_path")
 @patch("aws_pick.shell.backup_rc_file")
-@patch("pathlib.Path.exists", return_value=True)
-@patch(
-    "builtins.open",
-    new_callable=mock_open,
-    read_data='# Some content\nexport AWS_PROFILE="old-profile"\n',
-)
-def test_update_aws_profile_bash(mock_file, mock_exists, mock_backup, mock_get_rc_path):
+def test_update_aws_profile_bash(mock_backup, mock_get_rc_path, tmp_path):
     """Test updating AWS_PROFILE in bash."""
     # Setup mocks
-    rc_path = Path("/home/user/.bashrc")
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('# Some content\nexport AWS_PROFILE="old-profile"\n')
     shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
     mock_get_rc_path.return_value = (rc_path, shell_config)
-    mock_backup.return_value = Path("/home/user/.bashrc.bak-20250605060000")
+    mock_backup.return_value = tmp_path / ".bashrc.bak-20250605060000"
 
     # Call function
     success, backup_path = update_aws_profile("new-profile", "bash")
 
     # Assertions
     assert success is True
-    assert backup_path == Path("/home/user/.bashrc.bak-20250605060000")
+    assert backup_path == tmp_path / ".bashrc.bak-20250605060000"
     mock_backup.assert_called_once_with(rc_path)
 
     # Check file write
-    mock_file.assert_called_with(rc_path, "w")
-    handle = mock_file()
-    written_content = "".join(
-        call_args[0][0] for call_args in handle.write.call_args_list
-    )
-    assert 'export AWS_PROFILE="new-profile"' in written_content
+    assert 'export AWS_PROFILE="new-profile"' in rc_path.read_text()
+    assert [p.name for p in tmp_path.iterdir()] == [".bashrc"]
 
 
 @patch("aws_pick.shell.get_rc_path")
 @patch("aws_pick.shell.backup_rc_file")
-@patch("pathlib.Path.exists", return_value=True)
-@patch(
-    "builtins.open",
-    new_callable=mock_open,
-    read_data='# Some content\nset -gx AWS_PROFILE "old-profile"\n',
-)
-def test_update_aws_profile_fish(mock_file, mock_exists, mock_backup, mock_get_rc_path):
+def test_update_aws_profile_without_backup(mock_backup, mock_get_rc_path, tmp_path):
+    """backup=False rewrites the rc file without creating a backup."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('export AWS_PROFILE="old"\n')
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, backup_path = update_aws_profile("new", "bash", backup=False)
+
+    assert success is True
+    assert backup_path is None
+    mock_backup.assert_not_called()
+    assert rc_path.read_text() == 'export AWS_PROFILE="new"\n'
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_fish(mock_backup, mock_get_rc_path, tmp_path):
     """Test updating AWS_PROFILE in fish."""
     # Setup mocks
-    rc_path = Path("/home/user/.config/fish/config.fish")
+    rc_path = tmp_path / "config.fish"
+    rc_path.write_text('# Some content\nset -gx AWS_PROFILE "old-profile"\n')
     shell_config = ShellConfig("fish", rc_path, 'set -gx AWS_PROFILE "{profile_name}"')
     mock_get_rc_path.return_value = (rc_path, shell_config)
-    mock_backup.return_value = Path(
-        "/home/user/.config/fish/config.fish.bak-20250605060000"
-    )
+    mock_backup.return_value = tmp_path / "config.fish.bak-20250605060000"
 
     # Call function
     success, backup_path = update_aws_profile("new-profile", "fish")
 
     # Assertions
     assert success is True
-    assert backup_path == Path("/home/user/.config/fish/config.fish.bak-20250605060000")
+    assert backup_path == tmp_path / "config.fish.bak-20250605060000"
     mock_backup.assert_called_once_with(rc_path)
 
-    # Check file write
-    mock_file.assert_called_with(rc_path, "w")
-    handle = mock_file()
-    written_content = "".join(
-        call_args[0][0] for call_args in handle.write.call_args_list
+    # Check file write: the existing line is replaced, not duplicated
+    assert rc_path.read_text() == '# Some content\nset -gx AWS_PROFILE "new-profile"\n'
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_bash_crlf(mock_backup, mock_get_rc_path, tmp_path):
+    """A CRLF export line is replaced in place and keeps its line ending."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_bytes(b'# a\r\nexport AWS_PROFILE="old"\r\nalias x=y\r\n')
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, _ = update_aws_profile("new", "bash")
+
+    assert success is True
+    assert rc_path.read_bytes() == b'# a\r\nexport AWS_PROFILE="new"\r\nalias x=y\r\n'
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_fish_crlf(mock_backup, mock_get_rc_path, tmp_path):
+    """A CRLF fish line is replaced in place and keeps its line ending."""
+    rc_path = tmp_path / "config.fish"
+    rc_path.write_bytes(b'# Some content\r\nset -gx AWS_PROFILE "old-profile"\r\n')
+    shell_config = ShellConfig("fish", rc_path, 'set -gx AWS_PROFILE "{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, _ = update_aws_profile("new-profile", "fish")
+
+    assert success is True
+    assert (
+        rc_path.read_bytes()
+        == b'# Some content\r\nset -gx AWS_PROFILE "new-profile"\r\n'
     )
-    assert 'set -gx AWS_PROFILE "new-profile"' in written_content
 
 
 @patch("aws_pick.shell.get_rc_path")
-@patch("pathlib.Path.exists", return_value=True)
-@patch(
-    "builtins.open",
-    new_callable=mock_open,
-    read_data='export AWS_PROFILE="same-profile"\n',
-)
-def test_update_aws_profile_no_change(mock_file, mock_exists, mock_get_rc_path):
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_follows_symlink(mock_backup, mock_get_rc_path, tmp_path):
+    """A symlinked rc file stays a symlink and its target is updated."""
+    target = tmp_path / "dotfiles" / "bashrc"
+    target.parent.mkdir()
+    target.write_text('export AWS_PROFILE="old"\n')
+    target.chmod(0o600)
+    rc_path = tmp_path / ".bashrc"
+    rc_path.symlink_to(target)
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, _ = update_aws_profile("new", "bash")
+
+    assert success is True
+    assert rc_path.is_symlink()
+    assert target.read_text() == 'export AWS_PROFILE="new"\n'
+    assert target.stat().st_mode & 0o777 == 0o600
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_no_change(mock_backup, mock_get_rc_path, tmp_path):
     """Test when AWS_PROFILE is already set to the same value."""
     # Setup mocks
-    rc_path = Path("/home/user/.bashrc")
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('# rc\nexport AWS_PROFILE="same-profile"\nalias ll="ls -l"\n')
     shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
     mock_get_rc_path.return_value = (rc_path, shell_config)
+    inode = rc_path.stat().st_ino
 
     # Call function
     success, backup_path = update_aws_profile("same-profile", "bash")
@@ -286,9 +439,141 @@ def test_update_aws_profile_no_change(mock_file, mock_exists, mock_get_rc_path):
     assert backup_path is None
 
     # Check that file was not written
-    mock_file.assert_called_with(rc_path, "r")
-    handle = mock_file()
-    handle.write.assert_not_called()
+    mock_backup.assert_not_called()
+    assert rc_path.stat().st_ino == inode
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_no_change_single_quotes(
+    mock_backup, mock_get_rc_path, tmp_path
+):
+    """A differently quoted but equal value is still recognised as set."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text("export AWS_PROFILE='same-profile'\n")
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    assert update_aws_profile("same-profile", "bash") == (True, None)
+    mock_backup.assert_not_called()
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_preserves_surrounding_lines(
+    mock_backup, mock_get_rc_path, tmp_path
+):
+    """Lines before and after the AWS_PROFILE line survive a rewrite."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text(
+        "# header\nexport AWS_PROFILE=\"old\"\nalias ll='ls -l'\nexport EDITOR=vim\n"
+    )
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, _ = update_aws_profile("new", "bash")
+
+    assert success is True
+    assert rc_path.read_text() == (
+        "# header\nexport AWS_PROFILE=\"new\"\nalias ll='ls -l'\nexport EDITOR=vim\n"
+    )
+    mock_backup.assert_called_once_with(rc_path)
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_later_duplicate_line(
+    mock_backup, mock_get_rc_path, tmp_path
+):
+    """A matching line after a different AWS_PROFILE line is not a no-op."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('export AWS_PROFILE="old"\nexport AWS_PROFILE="new"\n')
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, _ = update_aws_profile("new", "bash")
+
+    assert success is True
+    mock_backup.assert_called_once_with(rc_path)
+    assert rc_path.read_text() == (
+        'export AWS_PROFILE="new"\nexport AWS_PROFILE="new"\n'
+    )
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_backslash_in_name(mock_backup, mock_get_rc_path, tmp_path):
+    """Profile names are written literally, not as regex replacements."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_text('export AWS_PROFILE="old"\n')
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, _ = update_aws_profile(r"team\1", "bash")
+
+    assert success is True
+    assert rc_path.read_text() == 'export AWS_PROFILE="team\\1"\n'
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_keeps_non_utf8_bytes(
+    mock_backup, mock_get_rc_path, tmp_path
+):
+    """Bytes outside the AWS_PROFILE line are written back untouched."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.write_bytes(b'# caf\xe9\r\nexport AWS_PROFILE="old"\n')
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    success, _ = update_aws_profile("new", "bash")
+
+    assert success is True
+    assert rc_path.read_bytes() == b'# caf\xe9\r\nexport AWS_PROFILE="new"\n'
+
+
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_empty_rc_file(mock_backup, mock_get_rc_path, tmp_path):
+    """An empty rc file gets the AWS_PROFILE line appended."""
+    rc_path = tmp_path / ".bashrc"
+    rc_path.touch()
+    shell_config = ShellConfig("bash", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    with patch("aws_pick.shell._profile_line_present") as mock_present:
+        success, _ = update_aws_profile("dev", "bash")
+
+    assert success is True
+    mock_present.assert_not_called()
+    assert rc_path.read_text() == '\n\n# Added by AWS Pick\nexport AWS_PROFILE="dev"\n'
+
+
+@pytest.mark.parametrize("line_count", [100, 1_000, 10_000])
+@patch("aws_pick.shell.get_rc_path")
+@patch("aws_pick.shell.backup_rc_file")
+def test_update_aws_profile_large_rc_file(
+    mock_backup, mock_get_rc_path, tmp_path, line_count
+):
+    """Large rc files get exactly one line changed and a cheap no-op rerun."""
+    rc_path = tmp_path / ".zshrc"
+    filler = [f"alias a{i}='echo {i}'\n" for i in range(line_count)]
+    half = line_count // 2
+    original = "".join(filler[:half]) + 'export AWS_PROFILE="old"\n'
+    original += "".join(filler[half:])
+    rc_path.write_text(original)
+    shell_config = ShellConfig("zsh", rc_path, 'export AWS_PROFILE="{profile_name}"')
+    mock_get_rc_path.return_value = (rc_path, shell_config)
+
+    assert update_aws_profile("dev", "zsh")[0] is True
+    assert rc_path.read_text() == original.replace('"old"', '"dev"')
+
+    # The rerun is answered by the mmap probe without the line scan
+    with patch.object(
+        ShellConfig, "get_profile_bytes_pattern", side_effect=AssertionError
+    ):
+        assert update_aws_profile("dev", "zsh") == (True, None)
+    mock_backup.assert_called_once_with(rc_path)
 
 
 @patch("aws_pick.shell.get_rc_path")
@@ -314,38 +599,22 @@ def test_update_aws_profile_no_rc_file_bash(mock_get_rc_path):
 
 @patch("aws_pick.shell.get_rc_path")
 @patch("aws_pick.shell.backup_rc_file")
-@patch("pathlib.Path.exists")
-@patch("pathlib.Path.mkdir")
-@patch("builtins.open", new_callable=mock_open)
-def test_update_aws_profile_no_rc_file_fish(
-    mock_file, mock_mkdir, mock_exists, mock_backup, mock_get_rc_path
-):
+def test_update_aws_profile_no_rc_file_fish(mock_backup, mock_get_rc_path, tmp_path):
     """Test when RC file doesn't exist for fish."""
     # Setup mocks
-    rc_path = Path("/home/user/.config/fish/config.fish")
+    rc_path = tmp_path / ".config" / "fish" / "config.fish"
     shell_config = ShellConfig("fish", rc_path, 'set -gx AWS_PROFILE "{profile_name}"')
     mock_get_rc_path.return_value = (rc_path, shell_config)
-
-    # Mock path operations
-    mock_exists.return_value = False
-    mock_mkdir.return_value = None
-    mock_backup.return_value = Path(
-        "/home/user/.config/fish/config.fish.bak-20250605060000"
-    )
+    mock_backup.return_value = tmp_path / "config.fish.bak-20250605060000"
 
     # Call function
     success, backup_path = update_aws_profile("new-profile", "fish")
 
     # Assertions
     assert success is True
-    mock_mkdir.assert_called_with(parents=True, exist_ok=True)
-    mock_file.assert_called_with(rc_path, "w")
-    handle = mock_file()
-    handle.write.assert_called()
-    written_content = "".join(
-        call_args[0][0] for call_args in handle.write.call_args_list
-    )
+    written_content = rc_path.read_text()
     assert "# Created by AWS Pick" in written_content
+    assert 'set -gx AWS_PROFILE "new-profile"' in written_content
 
 
 def test_generate_export_command():
@@ -363,9 +632,27 @@ def test_generate_export_command():
 def test_write_shared_profile(tmp_path, monkeypatch):
     """Test writing shared profile file."""
     monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    get_shared_profile_path.cache_clear()
 
-    shared_path = write_shared_profile("dev")
+    try:
+        shared_path = write_shared_profile("dev")
+    finally:
+        get_shared_profile_path.cache_clear()
 
     expected_path = tmp_path / ".config" / "awspick" / "profile"
     assert shared_path == expected_path
     assert expected_path.read_text() == "dev\n"
+
+
+def test_fish_pattern_matches_combined_scope_flags():
+    """set -gx/-Ux lines are recognised and replacing them keeps newlines."""
+    pattern = ShellConfig(
+        "fish", Path("/home/user/config.fish"), 'set -gx AWS_PROFILE "{profile_name}"'
+    ).get_profile_pattern()
+
+    assert pattern.search('set -gx AWS_PROFILE "dev"').group(1) == "dev"
+    assert pattern.search("set -Ux AWS_PROFILE dev").group(1) == "dev"
+    assert (
+        pattern.sub("X", 'set -gx AWS_PROFILE "dev"\n\nfunction f\nend\n')
+        == "X\n\nfunction f\nend\n"
+    )